@@ -1,5 +1,11 @@
-import os, requests, datetime, sys, time
-from jinja2 import Template
+import os, requests, datetime, sys, pathlib
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # =========================
 # Utilities & configuration
@@ -9,16 +15,18 @@ def fail(msg):
     print(f"[ERROR] {msg}", file=sys.stderr)
     sys.exit(1)
 
-# Required env vars
-for req in ["LEAGUE_ID", "ESPN_S2", "SWID"]:
-    if not os.environ.get(req):
-        fail(f"Missing env var {req}. Add it under GitHub Secrets.")
+# Required env vars (unset secrets arrive as empty strings, so check values, not keys)
+_missing = [req for req in ("LEAGUE_ID", "ESPN_S2", "SWID") if not os.environ.get(req)]
+if _missing:
+    fail(f"Missing env vars: {', '.join(_missing)}. Add them under GitHub Secrets.")
 
 LEAGUE_ID = os.environ["LEAGUE_ID"]
 SEASON = os.environ.get("SEASON")
 WEEK = os.environ.get("WEEK")
 ESPN_S2 = os.environ["ESPN_S2"]
 SWID = os.environ["SWID"]
+# Per-request HTTP logging is noisy across the 17-week challenge backfill; opt in with VERBOSE=1.
+VERBOSE = os.environ.get("VERBOSE", "").strip().lower() in ("1", "true", "yes")
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
@@ -40,6 +48,8 @@ POS_K = 17   # Kicker
 POS_TE = 6   # Tight End
 LINEUP_SLOT_FLEX = 23   # ESPN RB/WR/TE FLEX lineup slot id
 LINEUP_SLOT_IR = 21     # Injured reserve; not a starter
+NON_STARTER_SLOTS = frozenset({LINEUP_SLOT_BENCH, LINEUP_SLOT_IR})
+WINNER_BY_SIGN = ("away", "tie", "home")  # indexed by sign(home - away) + 1
 
 LOGO_URL = (
     os.environ.get("HEADER_IMG_URL")  # preferred (matches workflow)
@@ -56,90 +66,159 @@ if not LOGO_URL:
 # HTTP helpers
 # ============
 
+COOKIES = {"espn_s2": ESPN_S2, "SWID": SWID}
+
+# Throttling/5xx are retried inside urllib3 (honoring Retry-After); after the last
+# attempt the response is returned as-is so callers can fall through to the next host.
+RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# Weeks fetched in parallel by build_weekly_challenges; each past week needs only its boxscore.
+WEEK_FETCH_WORKERS = 4
+
+# Boxscores of finished weeks don't change, so they are kept on disk between runs
+# (the workflow restores this directory with actions/cache).
+ESPN_CACHE_DIR = os.environ.get("ESPN_CACHE", "/tmp/espn_cache")
+# Part of every cache file name; bump it to invalidate boxscores cached by earlier runs.
+ESPN_CACHE_VERSION = 2
+
+# One keep-alive session shared by every ESPN request in the run, sized for the peak
+# number of concurrent requests (espn_fetch_jsons' three views, or the weekly backfill)
+# so connections are reused rather than discarded.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=max(3, WEEK_FETCH_WORKERS), max_retries=RETRY))
+
 def _try_fetch(session, url, params, cookies):
+    """Returns (response, is_json); the content type is inspected once here."""
     r = session.get(url, params=params, cookies=cookies, timeout=30)
     ct = r.headers.get("Content-Type", "").lower()
-    print(f"[INFO] HTTP {r.status_code}  content-type={ct}  url={r.url}")
-    if "application/json" not in ct:
+    if VERBOSE or r.status_code != 200:
+        print(f"[INFO] HTTP {r.status_code}  content-type={ct}  url={r.url}")
+    is_json = ct.startswith("application/json")
+    if not is_json:
         snippet = (r.text or "")[:300].replace("\n", " ")
         print(f"[WARN] Non-JSON response snippet: {snippet}", file=sys.stderr)
-    return r
+    return r, is_json
 
 # =====================
 # ESPN data fetching
 # =====================
 
+def _fetch_view(hosts, params, label):
+    """Tries each host in turn; returns the decoded JSON for the first good response, else None."""
+    for host in hosts:
+        if VERBOSE:
+            print(f"[INFO] Fetching {label}: {host}")
+        r, is_json = _try_fetch(SESSION, host, params, COOKIES)
+        if r.status_code == 200 and is_json:
+            return orjson.loads(r.content)
+    return None
+
+def _league_hosts(league_id, season):
+    return [
+        f"https://fantasy.espn.com/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{league_id}",
+        f"https://lm-api-reads.fantasy.espn.com/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{league_id}",
+    ]
+
+@lru_cache(maxsize=None)
+def espn_fetch_boxscore(league_id, season, week):
+    """
+    Boxscore (mMatchup) for one scoring period, or None when the league doesn't expose it.
+    Rosters are per-period, so this is the only view past weeks need; memoized per run.
+    """
+    return _fetch_view(_league_hosts(league_id, season), {"view": "mMatchup", "scoringPeriodId": str(week)}, "boxscore via mMatchup")
+
+def _week_is_final(by_week: dict, week: int) -> bool:
+    sched = by_week.get(week)
+    return bool(sched) and all((m.get("winner") or "UNDECIDED").upper() != "UNDECIDED" for m in sched)
+
+def _boxscore_has_rosters(boxscore, week: int) -> bool:
+    """True when the boxscore carries this week's matchups with roster entries for every side."""
+    sched = [m for m in (boxscore or {}).get("schedule") or [] if m.get("matchupPeriodId") == week]
+    return bool(sched) and all(_safe_entries(m.get(side)) for m in sched for side in ("home", "away") if m.get(side))
+
+def _write_atomic(path: str, data: bytes):
+    """Writes to a sibling temp file, then renames over path so readers never see a partial file."""
+    tmp = pathlib.Path(f"{path}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+def espn_fetch_boxscore_cached(league_id, season, week):
+    """
+    espn_fetch_boxscore backed by ESPN_CACHE_DIR; only call this for weeks whose results are final.
+    Only complete boxscores are written, since a cached file is reused for the rest of the season.
+    """
+    path = os.path.join(ESPN_CACHE_DIR, f"{league_id}-{season}-w{week}.v{ESPN_CACHE_VERSION}.json")
+    try:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        pass
+    except orjson.JSONDecodeError:
+        print(f"[WARN] Ignoring unreadable cached boxscore {path}", file=sys.stderr)
+
+    boxscore = espn_fetch_boxscore(league_id, season, week)
+    if _boxscore_has_rosters(boxscore, week):
+        os.makedirs(ESPN_CACHE_DIR, exist_ok=True)
+        _write_atomic(path, orjson.dumps(boxscore))
+    return boxscore
+
 def espn_fetch_jsons(league_id, season, week):
     """
     Returns a dict with keys:
       - scoreboard: schedule + maybe teams
       - teams: teams (ensured)
       - boxscore: schedule with roster entries for the scoring period, when available
-    """
-    cookies = {"espn_s2": ESPN_S2, "SWID": SWID}
-    s = requests.Session()
-    s.headers.update(HEADERS)
-
-    hosts = [
-        f"https://fantasy.espn.com/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{league_id}",
-        f"https://lm-api-reads.fantasy.espn.com/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{league_id}",
-    ]
 
-    out = {"scoreboard": None, "teams": None, "boxscore": None}
-
-    # 1) Scoreboard (mMatchupScore)
-    for host in hosts:
-        print(f"[INFO] Trying scoreboard host: {host}")
-        for i in range(3):
-            r = _try_fetch(s, host, {"view": "mMatchupScore", "scoringPeriodId": str(week)}, cookies)
-            if r.status_code == 200 and r.headers.get("Content-Type", "").lower().startswith("application/json"):
-                out["scoreboard"] = r.json()
-                break
-            time.sleep(1 + i)
-        if out["scoreboard"] is not None:
-            break
-
-    if out["scoreboard"] is None:
+    The three views are fetched concurrently over the shared session.
+    """
+    hosts = _league_hosts(league_id, season)
+
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        # 1) Scoreboard (mMatchupScore)
+        fut_sb = ex.submit(_fetch_view, hosts, {"view": "mMatchupScore", "scoringPeriodId": str(week)}, "scoreboard via mMatchupScore")
+        # 2) Teams (mTeam); only used if the scoreboard doesn't carry them
+        fut_tm = ex.submit(_fetch_view, hosts, {"view": "mTeam"}, "teams via mTeam")
+        # 3) Boxscore (mMatchup) for lineups/players (best-effort; may not exist in all leagues)
+        fut_bx = ex.submit(espn_fetch_boxscore, league_id, season, week)
+        scoreboard = fut_sb.result()
+        team_payload = fut_tm.result()
+        boxscore = fut_bx.result()
+
+    if scoreboard is None:
         fail("Could not fetch scoreboard JSON (mMatchupScore).")
 
-    # 2) Teams (mTeam) if not present
-    if "teams" not in out["scoreboard"] or not out["scoreboard"].get("teams"):
-        for host in hosts:
-            print(f"[INFO] Fetching teams via mTeam: {host}")
-            r = _try_fetch(s, host, {"view": "mTeam"}, cookies)
-            if r.status_code == 200 and r.headers.get("Content-Type", "").lower().startswith("application/json"):
-                out["teams"] = r.json().get("teams", [])
-                break
+    if scoreboard.get("teams"):
+        teams = scoreboard.get("teams", [])
     else:
-        out["teams"] = out["scoreboard"].get("teams", [])
-
-    # 3) Boxscore (mMatchup) for lineups/players (best-effort; may not exist in all leagues)
-    for host in hosts:
-        print(f"[INFO] Fetching boxscore via mMatchup: {host}")
-        r = _try_fetch(s, host, {"view": "mMatchup", "scoringPeriodId": str(week)}, cookies)
-        if r.status_code == 200 and r.headers.get("Content-Type", "").lower().startswith("application/json"):
-            out["boxscore"] = r.json()
-            break
+        teams = team_payload.get("teams", []) if team_payload is not None else None
 
-    return out
+    return {"scoreboard": scoreboard, "teams": teams, "boxscore": boxscore}
 
 # =================
 # Transformations
 # =================
 
 def _team_display_name(t: dict) -> str:
-    loc = (t.get("location") or "").strip()
-    nick = (t.get("nickname") or "").strip()
-    nm = (t.get("name") or "").strip()
-    abbr = (t.get("abbrev") or "").strip()
-    tid = t.get("id")
-    if loc or nick:
-        return f"{loc} {nick}".strip()
-    if nm:
-        return nm
-    if abbr:
-        return abbr
-    return f"Team {tid}" if tid is not None else "Team"
+    # "Location Nickname", else name, else abbrev; later fields are only read when needed.
+    return (
+        f"{(t.get('location') or '').strip()} {(t.get('nickname') or '').strip()}".strip()
+        or (t.get("name") or "").strip()
+        or (t.get("abbrev") or "").strip()
+        or (f"Team {t['id']}" if t.get("id") is not None else "Team")
+    )
+
+def build_team_name_map(teams: list[dict]) -> dict:
+    """
+    Map team id -> display name from ESPN team objects.
+    """
+    return {t.get("id"): _team_display_name(t) for t in (teams or []) if t.get("id") is not None}
 
 def build_team_logo_map(teams: list[dict]) -> dict:
     """
@@ -153,77 +232,91 @@ def build_team_logo_map(teams: list[dict]) -> dict:
             logo_map[name] = logo
     return logo_map
 
-def summarize_matchups(scoreboard, teams, week):
-    team_map = {t.get("id"): _team_display_name(t) for t in (teams or []) if t.get("id") is not None}
-    print(f"[INFO] Built team name map for {len(team_map)} teams")
+def _index_schedule_by_week(schedule):
+    """
+    Group schedule entries by matchupPeriodId so per-week lookups skip the rest of the season.
+    """
+    by_week = {}
+    for m in schedule or []:
+        by_week.setdefault(m.get("matchupPeriodId"), []).append(m)
+    return by_week
 
+def _summarize_week_schedule(week_schedule, team_map: dict):
+    """
+    Matchup rows for schedule entries already narrowed to a single week (e.g. one _index_schedule_by_week bucket).
+    """
+    team_name = team_map.get
     matchups = []
-    for m in (scoreboard.get("schedule") or []):
-        if m.get("matchupPeriodId") != int(week):
-            continue
-        if "away" not in m or "home" not in m:
+    for m in week_schedule:
+        home = m.get("home")
+        away = m.get("away")
+        if home is None or away is None:
             continue
-        hid = m["home"]["teamId"]
-        aid = m["away"]["teamId"]
-        home_pts = float(m["home"].get("totalPoints", 0) or 0)
-        away_pts = float(m["away"].get("totalPoints", 0) or 0)
+        hid, aid = home["teamId"], away["teamId"]
+        home_pts = float(home.get("totalPoints") or 0)
+        away_pts = float(away.get("totalPoints") or 0)
+        diff = home_pts - away_pts
+        sign = (diff > 0) - (diff < 0)
 
+        # ESPN's winner flag wins unless the scores are level; otherwise go by points.
         winner_flag = (m.get("winner") or "UNDECIDED").upper()
-        if winner_flag == "HOME" and home_pts != away_pts:
-            winner = "home"
-        elif winner_flag == "AWAY" and home_pts != away_pts:
-            winner = "away"
-        elif home_pts > away_pts:
-            winner = "home"
-        elif away_pts > home_pts:
-            winner = "away"
+        if sign and winner_flag in ("HOME", "AWAY"):
+            winner = winner_flag.lower()
+        elif sign or winner_flag != "UNDECIDED":
+            winner = WINNER_BY_SIGN[sign + 1]
         else:
-            winner = "tie" if home_pts == away_pts and winner_flag != "UNDECIDED" else "undecided"
+            winner = "undecided"
 
         matchups.append({
             "home_id": hid,
             "away_id": aid,
-            "home": team_map.get(hid, f"Team {hid}"),
-            "away": team_map.get(aid, f"Team {aid}"),
+            "home": team_name(hid) or f"Team {hid}",
+            "away": team_name(aid) or f"Team {aid}",
             "home_pts": round(home_pts, 2),
             "away_pts": round(away_pts, 2),
             "winner": winner,
-            "abs_margin": round(abs(home_pts - away_pts), 2),
+            "abs_margin": round(abs(diff), 2),
         })
     return matchups
 
-def extract_standings(teams):
-    def get_record_fields(t: dict):
-        rec = (t.get("record") or {}).get("overall") or {}
-        wins = rec.get("wins")
-        losses = rec.get("losses")
-        ties = rec.get("ties")
-        points_against = rec.get("pointsAgainst") if isinstance(rec, dict) else None
-        # fallbacks
-        wins = t.get("overallWins", wins)
-        losses = t.get("overallLosses", losses)
-        ties = t.get("overallTies", ties)
-        return (int(wins or 0), int(losses or 0), int(ties or 0), float(points_against or 0))
-
-    def get_points_for(t: dict) -> float:
-        pf = t.get("points")
-        if isinstance(pf, (int, float)):
-            return float(pf)
-        if isinstance(pf, dict):
-            val = pf.get("scored")
-            if isinstance(val, (int, float)):
-                return float(val)
-        vbs = t.get("valuesByStat") or {}
-        stat0 = vbs.get("0")
-        if isinstance(stat0, (int, float)):
-            return float(stat0)
-        return 0.0
+def summarize_matchups(scoreboard, teams, week: int, team_map=None):
+    if team_map is None:
+        team_map = build_team_name_map(teams)
+    schedule = scoreboard.get("schedule") or []
+    return _summarize_week_schedule([m for m in schedule if m.get("matchupPeriodId") == week], team_map)
+
+def _record_fields(t: dict):
+    rec = (t.get("record") or {}).get("overall") or {}
+    wins = rec.get("wins")
+    losses = rec.get("losses")
+    ties = rec.get("ties")
+    points_against = rec.get("pointsAgainst") if isinstance(rec, dict) else None
+    # fallbacks
+    wins = t.get("overallWins", wins)
+    losses = t.get("overallLosses", losses)
+    ties = t.get("overallTies", ties)
+    return (int(wins or 0), int(losses or 0), int(ties or 0), float(points_against or 0))
+
+def _points_for(t: dict) -> float:
+    pf = t.get("points")
+    if isinstance(pf, (int, float)):
+        return float(pf)
+    if isinstance(pf, dict):
+        val = pf.get("scored")
+        if isinstance(val, (int, float)):
+            return float(val)
+    vbs = t.get("valuesByStat") or {}
+    stat0 = vbs.get("0")
+    if isinstance(stat0, (int, float)):
+        return float(stat0)
+    return 0.0
 
+def extract_standings(teams):
     rows = []
     for t in (teams or []):
         name = _team_display_name(t)
-        wins, losses, ties, pa = get_record_fields(t)
-        pf = round(get_points_for(t), 2)
+        wins, losses, ties, pa = _record_fields(t)
+        pf = round(_points_for(t), 2)
         rows.append({
             "name": name,
             "wins": wins,
@@ -232,10 +325,10 @@ def extract_standings(teams):
             "points_for": pf,
             "points_against": round(pa, 2),
         })
-    rows.sort(key=lambda r: (r["wins"], r["points_for"]), reverse=True)
+    rows.sort(key=itemgetter("wins", "points_for"), reverse=True)
     return rows
 
-def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int | None = None) -> list[dict]:
+def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int | None = None, team_map: dict | None = None) -> list[dict]:
     """
     Pulls the *actual* ESPN playoff schedule (winners & consolation brackets)
     using the mMatchup view, and returns rows for the email template.
@@ -244,21 +337,18 @@ def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int
     matchup week (matchupPeriodId == current_week+1), falling back to the earliest
     playoff week >= current_week+1. This prevents showing already-played Round 1.
     """
-    cookies = {"espn_s2": ESPN_S2, "SWID": SWID}
-    s = requests.Session()
-    s.headers.update(HEADERS)
-
     base = f"https://lm-api-reads.fantasy.espn.com/apis/v3/games/ffl/seasons/{season}/segments/0/leagues/{LEAGUE_ID}"
-    r = _try_fetch(s, base, {"view": "mMatchup"}, cookies)
-    if r.status_code != 200:
+    r, is_json = _try_fetch(SESSION, base, {"view": "mMatchup"}, COOKIES)
+    if r.status_code != 200 or not is_json:
         return []
 
-    data = r.json() or {}
+    data = orjson.loads(r.content) or {}
     schedule = data.get("schedule") or []
     if not schedule:
         return []
 
-    team_map = {t.get("id"): _team_display_name(t) for t in (teams or []) if t.get("id") is not None}
+    if team_map is None:
+        team_map = build_team_name_map(teams)
     logo_map = build_team_logo_map(teams)
 
     playoff_games = []
@@ -295,8 +385,8 @@ def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int
             status = "In progress"
             result_tag = "LIVE"
 
-        team1_name = team_map.get(hid, f"Team {hid}")
-        team2_name = team_map.get(aid, f"Team {aid}")
+        team1_name = team_map.get(hid) or f"Team {hid}"
+        team2_name = team_map.get(aid) or f"Team {aid}"
 
         playoff_games.append({
             "round_id": int(round_id),
@@ -317,7 +407,7 @@ def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int
 
     # ✅ NEW: pick the next playoff matchup week relative to the recap email week
     if current_week is not None:
-        next_week = int(current_week) + 1
+        next_week = current_week + 1
         with_mpid = [g for g in playoff_games if isinstance(g.get("matchup_period_id"), int)]
 
         exact = [g for g in with_mpid if g["matchup_period_id"] == next_week]
@@ -376,7 +466,7 @@ def build_real_playoff_bracket(season: int, teams: list[dict], current_week: int
             "_mpid": g.get("matchup_period_id") or 999,
         })
 
-    rows.sort(key=lambda x: (x["_mpid"], x["_tier_order"], x["team1"]))
+    rows.sort(key=itemgetter("_mpid", "_tier_order", "team1"))
     for r in rows:
         r.pop("_tier_order", None)
         r.pop("_mpid", None)
@@ -522,13 +612,13 @@ def compute_waiver_order(teams: list[dict], standings: list[dict]) -> list[dict]
         if pri is not None:
             pri_rows.append({"name": team_name(t), "priority": pri})
     if pri_rows and len(pri_rows) >= max(1, len(teams) // 2):
-        pri_rows.sort(key=lambda r: r["priority"])
+        pri_rows.sort(key=itemgetter("priority"))
         for i, r in enumerate(pri_rows, start=1):
             r["rank"] = i
         return [{"rank": r["rank"], "name": r["name"]} for r in pri_rows]
 
     if standings:
-        inv = sorted(standings, key=lambda r: (r["wins"], r["points_for"]))
+        inv = sorted(standings, key=itemgetter("wins", "points_for"))
         return [{"rank": i, "name": r["name"]} for i, r in enumerate(inv, start=1)]
 
     alpha = sorted([team_name(t) for t in teams])
@@ -538,6 +628,14 @@ def compute_waiver_order(teams: list[dict], standings: list[dict]) -> list[dict]
 # Build week/player details
 # ==========================
 
+_EMPTY: dict = {}  # shared read-only stand-in for missing nested objects
+_NUMBER = (int, float)
+
+# Fallback key orders for ESPN's per-player points and projections (first numeric hit wins).
+_POINTS_KEYS = ("appliedStatTotal", "appliedTotal", "points", "totalPoints")
+_RATING_PROJ_KEYS = ("totalProjection", "totalProjectedPoints", "totalProjectPoints", "totalProjectionPoints")
+_ENTRY_PROJ_KEYS = ("projectedPoints", "projectedTotal", "pointsProjected")
+
 def _safe_entries(side):
     if not isinstance(side, dict):
         return []
@@ -545,31 +643,28 @@ def _safe_entries(side):
     entries = (r or {}).get("entries") if isinstance(r, dict) else None
     return entries or []
 
-def build_week_stats_from_boxscore(boxscore, teams, week):
+def build_week_stats_from_boxscore(boxscore, teams, week: int, team_map=None):
     if not isinstance(boxscore, dict):
         return None
 
-    team_map = {t.get("id"): _team_display_name(t) for t in (teams or []) if t.get("id") is not None}
+    if team_map is None:
+        team_map = build_team_name_map(teams)
     rows = []
-    wk = int(week)
+    wk_key = str(week)
 
     def _extract_points(e, ppe, player, wk_local):
-        for k in ("appliedStatTotal", "appliedTotal", "points", "totalPoints"):
-            v = e.get(k)
-            if isinstance(v, (int, float)):
-                return float(v)
-        if isinstance(ppe, dict):
-            for k in ("appliedStatTotal", "appliedTotal", "points", "totalPoints"):
-                v = ppe.get(k)
-                if isinstance(v, (int, float)):
+        for src in (e, ppe):
+            for k in _POINTS_KEYS:
+                v = src.get(k)
+                if isinstance(v, _NUMBER):
                     return float(v)
-        stats = (player or {}).get("stats")
+        stats = player.get("stats")
         if isinstance(stats, list):
             for st in stats:
                 try:
-                    if int(st.get("scoringPeriodId")) == wk_local and st.get("statSourceId") in (0,):
+                    if int(st.get("scoringPeriodId")) == wk_local and st.get("statSourceId") == 0:
                         val = st.get("appliedTotal") or st.get("appliedStatTotal") or st.get("points")
-                        if isinstance(val, (int, float)):
+                        if isinstance(val, _NUMBER):
                             return float(val)
                 except Exception:
                     continue
@@ -578,7 +673,7 @@ def build_week_stats_from_boxscore(boxscore, teams, week):
             total = 0.0
             any_num = False
             for v in apps.values():
-                if isinstance(v, (int, float)):
+                if isinstance(v, _NUMBER):
                     total += float(v)
                     any_num = True
             if any_num:
@@ -586,101 +681,126 @@ def build_week_stats_from_boxscore(boxscore, teams, week):
         return 0.0
 
     def _extract_proj(e, ppe, wk_key):
-        ratings = e.get("ratings")
-        if isinstance(ratings, dict):
-            rW = ratings.get(wk_key) or ratings.get("0") or {}
-            for k in ("totalProjection", "totalProjectedPoints", "totalProjectPoints", "totalProjectionPoints"):
-                if isinstance(rW.get(k), (int, float)):
-                    return float(rW[k])
-        pr = ppe.get("ratings") if isinstance(ppe, dict) else None
-        if isinstance(pr, dict):
-            rW = pr.get(wk_key) or pr.get("0") or {}
-            for k in ("totalProjection", "totalProjectedPoints", "totalProjectPoints", "totalProjectionPoints"):
-                if isinstance(rW.get(k), (int, float)):
-                    return float(rW[k])
-        for k in ("projectedPoints", "projectedTotal", "pointsProjected"):
+        for src in (e, ppe):
+            ratings = src.get("ratings")
+            if isinstance(ratings, dict):
+                rW = ratings.get(wk_key) or ratings.get("0") or _EMPTY
+                for k in _RATING_PROJ_KEYS:
+                    v = rW.get(k)
+                    if isinstance(v, _NUMBER):
+                        return float(v)
+        for k in _ENTRY_PROJ_KEYS:
             v = e.get(k)
-            if isinstance(v, (int, float)):
+            if isinstance(v, _NUMBER):
                 return float(v)
         return None
 
     def parse_entries(e_list):
         out = []
-        wk_key = str(wk)
+        append = out.append
         for e in (e_list or []):
+            # Malformed entries (non-dict e/ppe) raise AttributeError and are skipped.
             try:
-                ppe = e.get("playerPoolEntry", {}) if isinstance(e, dict) else {}
-                player = ppe.get("player", {}) if isinstance(ppe, dict) else {}
-                full = player.get("fullName") or player.get("name") or "Player"
-                posId = player.get("defaultPositionId")
-                slotId = e.get("lineupSlotId")
-
-                pts = _extract_points(e, ppe, player, wk)
-                proj = _extract_proj(e, ppe, wk_key)
-
-                out.append({
-                    "name": full,
-                    "posId": posId,
-                    "slotId": slotId,
-                    "points": round(float(pts), 2),
-                    "proj": float(proj) if isinstance(proj, (int, float)) else None,
+                ppe = e.get("playerPoolEntry") or _EMPTY
+                player = ppe.get("player") or _EMPTY
+                append({
+                    "name": player.get("fullName") or player.get("name") or "Player",
+                    "posId": player.get("defaultPositionId"),
+                    "slotId": e.get("lineupSlotId"),
+                    # _extract_points always returns a float; _extract_proj a float or None
+                    "points": round(_extract_points(e, ppe, player, week), 2),
+                    "proj": _extract_proj(e, ppe, wk_key),
                 })
             except Exception:
                 continue
         return out
 
-    def _safe_entries_local(side):
-        if not isinstance(side, dict):
-            return []
-        r = side.get("rosterForCurrentScoringPeriod") or side.get("rosterForMatchupPeriod")
-        return (r or {}).get("entries") or []
+    def split_lineup(entries):
+        starters, bench = [], []
+        for x in entries:
+            (bench if x["slotId"] in NON_STARTER_SLOTS else starters).append(x)
+        return starters, bench
+
+    def side_summary(starters, bench):
+        # One walk over the lineup for every player-level weekly challenge.
+        top = top_flex = None
+        top_by_pos = {}
+        rb_points = proj_sum = 0.0
+        any_proj = nonzero_proj = False
+        for p in starters:
+            pr = p["proj"]
+            if pr is not None:
+                proj_sum += pr
+                any_proj = True
+                nonzero_proj = nonzero_proj or pr != 0
+            pts = p["points"]
+            if top is None or pts > top["points"]:
+                top = p
+            pos = p["posId"]
+            cur = top_by_pos.get(pos)
+            if cur is None or pts > cur["points"]:
+                top_by_pos[pos] = p
+            if p["slotId"] == LINEUP_SLOT_FLEX and (top_flex is None or pts > top_flex["points"]):
+                top_flex = p
+            if pos == POS_RB:
+                rb_points += pts
+        low_bench = None
+        for p in bench:
+            if low_bench is None or p["points"] < low_bench["points"]:
+                low_bench = p
+        return {
+            "top_starter": top,
+            "top_by_pos": top_by_pos,
+            "top_flex": top_flex,
+            "low_bench": low_bench,
+            "rb_points": rb_points,
+            "proj": round(proj_sum, 2) if any_proj else None,
+            # Unrounded total for the closest-to-projection challenge, which ignores all-zero projections.
+            "proj_sum": proj_sum if nonzero_proj else None,
+        }
 
     for m in (boxscore.get("schedule") or []):
-        if m.get("matchupPeriodId") != wk:
+        if m.get("matchupPeriodId") != week:
             continue
         home = m.get("home") or {}
         away = m.get("away") or {}
         hid, aid = home.get("teamId"), away.get("teamId")
 
-        h_entries = parse_entries(_safe_entries_local(home))
-        a_entries = parse_entries(_safe_entries_local(away))
+        h_entries = parse_entries(_safe_entries(home))
+        a_entries = parse_entries(_safe_entries(away))
 
-        EXCLUDE = {LINEUP_SLOT_BENCH, LINEUP_SLOT_IR}
-        h_starters = [x for x in h_entries if x.get("slotId") not in EXCLUDE]
-        h_bench = [x for x in h_entries if x.get("slotId") in EXCLUDE]
-        a_starters = [x for x in a_entries if x.get("slotId") not in EXCLUDE]
-        a_bench = [x for x in a_entries if x.get("slotId") in EXCLUDE]
+        h_starters, h_bench = split_lineup(h_entries)
+        a_starters, a_bench = split_lineup(a_entries)
 
         hpts = float(home.get("totalPoints", 0) or 0)
         apts = float(away.get("totalPoints", 0) or 0)
         margin = abs(hpts - apts)
         winner = "home" if hpts > apts else ("away" if apts > hpts else "tie")
-
-        def sum_proj(starters):
-            projs = [p["proj"] for p in starters if isinstance(p.get("proj"), (int, float))]
-            return round(sum(projs), 2) if projs else None
+        # The f-string fallback is only built when the id is missing from the map.
+        h_name = team_map.get(hid) or f"Team {hid}"
+        a_name = team_map.get(aid) or f"Team {aid}"
 
         rows.append({
-            "team": team_map.get(hid, f"Team {hid}"),
+            "team": h_name,
             "pts": round(hpts, 2),
-            "opp": team_map.get(aid, f"Team {aid}"),
+            "opp": a_name,
             "opp_pts": round(apts, 2),
             "won": winner == "home",
             "abs_margin": round(margin, 2),
             "starters": h_starters,
             "bench": h_bench,
-            "proj": sum_proj(h_starters),
+            **side_summary(h_starters, h_bench),
         })
         rows.append({
-            "team": team_map.get(aid, f"Team {aid}"),
+            "team": a_name,
             "pts": round(apts, 2),
-            "opp": team_map.get(hid, f"Team {hid}"),
+            "opp": h_name,
             "opp_pts": round(hpts, 2),
             "won": winner == "away",
             "abs_margin": round(margin, 2),
             "starters": a_starters,
             "bench": a_bench,
-            "proj": sum_proj(a_starters),
+            **side_summary(a_starters, a_bench),
         })
 
     return rows
@@ -689,242 +809,215 @@ def build_week_stats_from_boxscore(boxscore, teams, week):
 # Weekly challenge logic
 # ======================
 
-def compute_week_challenge(week: int, matchups, standings, week_rows):
-    """
-    Returns dict {title:'Weekly Challenge Winner', winner:'Team ...', detail:'...'} or None.
-    Implements your updated rotation for Weeks 1–17.
-    """
-
-    def highest_scoring_team():
-        all_rows = []
-        for m in matchups:
-            all_rows.append({"team": m["home"], "pts": m["home_pts"]})
-            all_rows.append({"team": m["away"], "pts": m["away_pts"]})
-        if not all_rows:
-            return None
-        row = max(all_rows, key=lambda r: r["pts"])
-        return ("Highest scoring team", row["team"], f"{row['pts']} pts")
-
-    def team_with_highest_scoring_player_starters_incl_dst():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                pts = p.get("points", 0)
-                if best is None or pts > best["points"]:
-                    best = {"team": r["team"], "player": p.get("name", "Player"), "points": pts}
-        if not best:
-            return None
-        return ("Highest scoring player (starter, D/ST incl.)", best["team"], f"{best['player']} — {best['points']} pts")
-
-    def team_with_highest_scoring_bench_player():
-        if not week_rows:
-            return None
-        worst = None
-        for r in week_rows:
-            for p in (r.get("bench") or []):
-                pts = p.get("points", 0)
-                if worst is None or pts < worst["points"]:
-                    worst = {"team": r["team"], "player": p.get("name", "Player"), "points": pts}
-        if not worst:
-            return None
-        return ("Highest scoring bench player", worst["team"], f"{worst['player']} — {worst['points']} pts")
+# Each helper takes (week, matchups, standings, week_rows) and returns
+# (subtitle, winner, detail) or None.
+
+def _top_across_rows(week_rows, pick):
+    # pick(row) -> that row's precomputed best entry (or None); first row wins ties.
+    best_team = best = None
+    for r in week_rows:
+        p = pick(r)
+        if p is not None and (best is None or p["points"] > best["points"]):
+            best_team, best = r["team"], p
+    return best_team, best
+
+def _highest_scoring_team(week, matchups, standings, week_rows):
+    team = pts = None
+    for m in matchups:
+        if pts is None or m["home_pts"] > pts:
+            team, pts = m["home"], m["home_pts"]
+        if m["away_pts"] > pts:
+            team, pts = m["away"], m["away_pts"]
+    if pts is None:
+        return None
+    return ("Highest scoring team", team, f"{pts} pts")
 
-    def smallest_margin_of_victory():
-        winners = [m for m in matchups if m["winner"] in ("home", "away")]
-        if not winners:
-            return None
-        m = min(winners, key=lambda x: x["abs_margin"])
-        win_team = m["home"] if m["winner"] == "home" else m["away"]
-        return ("Smallest margin of victory", win_team, f"margin {m['abs_margin']}")
+def _team_with_highest_scoring_player_starters_incl_dst(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_starter"])
+    if not best:
+        return None
+    return ("Highest scoring player (starter, D/ST incl.)", team, f"{best['name']} — {best['points']} pts")
 
-    def widest_margin_of_victory():
-        winners = [m for m in matchups if m["winner"] in ("home", "away")]
-        if not winners:
-            return None
-        m = max(winners, key=lambda x: x["abs_margin"])
-        win_team = m["home"] if m["winner"] == "home" else m["away"]
-        return ("Widest margin of victory", win_team, f"margin {m['abs_margin']}")
+def _team_with_highest_scoring_bench_player(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team = worst = None
+    for r in week_rows:
+        p = r["low_bench"]
+        if p is not None and (worst is None or p["points"] < worst["points"]):
+            team, worst = r["team"], p
+    if not worst:
+        return None
+    return ("Highest scoring bench player", team, f"{worst['name']} — {worst['points']} pts")
+
+def _smallest_margin_of_victory(week, matchups, standings, week_rows):
+    m = None
+    for x in matchups:
+        if x["winner"] in ("home", "away") and (m is None or x["abs_margin"] < m["abs_margin"]):
+            m = x
+    if m is None:
+        return None
+    win_team = m["home"] if m["winner"] == "home" else m["away"]
+    return ("Smallest margin of victory", win_team, f"margin {m['abs_margin']}")
+
+def _widest_margin_of_victory(week, matchups, standings, week_rows):
+    m = None
+    for x in matchups:
+        if x["winner"] in ("home", "away") and (m is None or x["abs_margin"] > m["abs_margin"]):
+            m = x
+    if m is None:
+        return None
+    win_team = m["home"] if m["winner"] == "home" else m["away"]
+    return ("Widest margin of victory", win_team, f"margin {m['abs_margin']}")
 
-    def highest_scoring_starting_k():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                if p.get("posId") == POS_K:
-                    pts = p.get("points", 0)
-                    if best is None or pts > best["points"]:
-                        best = {"team": r["team"], "player": p.get("name", "K"), "points": pts}
-        if not best:
-            return None
-        return ("Highest scoring starting K", best["team"], f"{best['player']} — {best['points']} pts")
+def _highest_scoring_starting_k(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_by_pos"].get(POS_K))
+    if not best:
+        return None
+    return ("Highest scoring starting K", team, f"{best['name']} — {best['points']} pts")
 
-    def highest_scoring_starting_qb():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                if p.get("posId") == POS_QB:
-                    pts = p.get("points", 0)
-                    if best is None or pts > best["points"]:
-                        best = {"team": r["team"], "player": p.get("name", "QB"), "points": pts}
-        if not best:
-            return None
-        return ("Highest scoring starting QB", best["team"], f"{best['player']} — {best['points']} pts")
-
-    def most_points_scored_in_losing_effort():
-        rows = []
-        for m in matchups:
-            if m["winner"] == "home":
-                rows.append({"team": m["away"], "pts": m["away_pts"]})
-            elif m["winner"] == "away":
-                rows.append({"team": m["home"], "pts": m["home_pts"]})
-        if not rows:
-            return None
-        r = max(rows, key=lambda x: x["pts"])
-        return ("Most points in a losing effort", r["team"], f"{r['pts']} pts")
+def _highest_scoring_starting_qb(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_by_pos"].get(POS_QB))
+    if not best:
+        return None
+    return ("Highest scoring starting QB", team, f"{best['name']} — {best['points']} pts")
+
+def _most_points_scored_in_losing_effort(week, matchups, standings, week_rows):
+    team = pts = None
+    for m in matchups:
+        if m["winner"] == "home":
+            loser, loser_pts = m["away"], m["away_pts"]
+        elif m["winner"] == "away":
+            loser, loser_pts = m["home"], m["home_pts"]
+        else:
+            continue
+        if pts is None or loser_pts > pts:
+            team, pts = loser, loser_pts
+    if pts is None:
+        return None
+    return ("Most points in a losing effort", team, f"{pts} pts")
 
-    def first_place_after_week9():
-        if week < 9 or not standings:
-            return None
-        top = standings[0]
-        ties = f"-{top['ties']}" if top.get("ties") else ""
-        return ("First place overall (after 9 weeks)", top["name"], f"{top['wins']}-{top['losses']}{ties}, PF {top['points_for']}")
+def _first_place_after_week9(week, matchups, standings, week_rows):
+    if week < 9 or not standings:
+        return None
+    top = standings[0]
+    ties = f"-{top['ties']}" if top.get("ties") else ""
+    return ("First place overall (after 9 weeks)", top["name"], f"{top['wins']}-{top['losses']}{ties}, PF {top['points_for']}")
 
-    def team_with_dst_most_points():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                if p.get("posId") == POS_DST:
-                    pts = p.get("points", 0)
-                    if best is None or pts > best["points"]:
-                        best = {"team": r["team"], "player": p.get("name", "D/ST"), "points": pts}
-        if not best:
-            return None
-        return ("D/ST with most points", best["team"], f"{best['player']} — {best['points']} pts")
+def _team_with_dst_most_points(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_by_pos"].get(POS_DST))
+    if not best:
+        return None
+    return ("D/ST with most points", team, f"{best['name']} — {best['points']} pts")
 
-    def highest_combined_starting_rb_points_incl_flex():
-        if not week_rows:
-            return None
-        best_team = None
-        best_sum = -1.0
-        for r in week_rows:
-            total = 0.0
-            for p in (r.get("starters") or []):
-                if p.get("posId") == POS_RB:
-                    total += float(p.get("points", 0) or 0)
-            if total > best_sum:
-                best_sum = total
-                best_team = r["team"]
-        if best_team is None:
-            return None
-        return ("Highest combined starting RB points", best_team, f"{round(best_sum, 2)} pts")
+def _highest_combined_starting_rb_points_incl_flex(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    best_team = None
+    best_sum = -1.0
+    for r in week_rows:
+        if r["rb_points"] > best_sum:
+            best_sum = r["rb_points"]
+            best_team = r["team"]
+    if best_team is None:
+        return None
+    return ("Highest combined starting RB points", best_team, f"{round(best_sum, 2)} pts")
 
-    def team_closest_to_projected_total():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            proj_sum = 0.0
-            have_proj = False
-            for p in (r.get("starters") or []):
-                pr = None
-                for k in ("projectedPoints", "projectedTotal", "proj", "pointsProjected"):
-                    pr = pr or p.get(k)
-                if isinstance(pr, (int, float)):
-                    proj_sum += float(pr)
-                    have_proj = True
-            if not have_proj:
-                continue
-            diff = abs(r["pts"] - proj_sum)
-            if best is None or diff < best["diff"]:
-                best = {"team": r["team"], "proj": round(proj_sum, 2), "actual": r["pts"], "diff": round(diff, 2)}
-        if not best:
-            return None
-        return ("Closest to projected total", best["team"], f"diff {best['diff']} (proj {best['proj']} vs {best['actual']})")
+def _team_closest_to_projected_total(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    best = None
+    for r in week_rows:
+        proj_sum = r["proj_sum"]
+        if proj_sum is None:
+            continue
+        diff = abs(r["pts"] - proj_sum)
+        if best is None or diff < best["diff"]:
+            best = {"team": r["team"], "proj": round(proj_sum, 2), "actual": r["pts"], "diff": round(diff, 2)}
+    if not best:
+        return None
+    return ("Closest to projected total", best["team"], f"diff {best['diff']} (proj {best['proj']} vs {best['actual']})")
 
-    def most_points_against_cumulative():
-        if not standings:
-            return None
-        r = max(standings, key=lambda t: t.get("points_against", 0))
-        pa = r.get("points_against", 0)
-        return ("Most points against (season)", r["name"], f"{pa} against")
-
-    def lowest_scoring_team():
-        all_rows = []
-        for m in matchups:
-            all_rows.append({"team": m["home"], "pts": m["home_pts"]})
-            all_rows.append({"team": m["away"], "pts": m["away_pts"]})
-        if not all_rows:
-            return None
-        row = min(all_rows, key=lambda r: r["pts"])
-        return ("Lowest weekly score", row["team"], f"{row['pts']} pts")
+def _most_points_against_cumulative(week, matchups, standings, week_rows):
+    if not standings:
+        return None
+    # extract_standings always sets points_against.
+    r = max(standings, key=itemgetter("points_against"))
+    return ("Most points against (season)", r["name"], f"{r['points_against']} against")
+
+def _lowest_scoring_team(week, matchups, standings, week_rows):
+    team = pts = None
+    for m in matchups:
+        if pts is None or m["home_pts"] < pts:
+            team, pts = m["home"], m["home_pts"]
+        if m["away_pts"] < pts:
+            team, pts = m["away"], m["away_pts"]
+    if pts is None:
+        return None
+    return ("Lowest weekly score", team, f"{pts} pts")
 
-    def highest_scoring_flex():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                if p.get("slotId") == LINEUP_SLOT_FLEX:
-                    pts = p.get("points", 0)
-                    if best is None or pts > best["points"]:
-                        best = {"team": r["team"], "player": p.get("name", "FLEX"), "points": pts}
-        if not best:
-            return None
-        return ("Highest scoring FLEX", best["team"], f"{best['player']} — {best['points']} pts")
+def _highest_scoring_flex(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_flex"])
+    if not best:
+        return None
+    return ("Highest scoring FLEX", team, f"{best['name']} — {best['points']} pts")
 
-    def highest_scoring_te():
-        if not week_rows:
-            return None
-        best = None
-        for r in week_rows:
-            for p in (r.get("starters") or []):
-                if p.get("posId") == POS_TE:
-                    pts = p.get("points", 0)
-                    if best is None or pts > best["points"]:
-                        best = {"team": r["team"], "player": p.get("name", "TE"), "points": pts}
-        if not best:
-            return None
-        return ("Highest scoring TE", best["team"], f"{best['player']} — {best['points']} pts")
+def _highest_scoring_te(week, matchups, standings, week_rows):
+    if not week_rows:
+        return None
+    team, best = _top_across_rows(week_rows, lambda r: r["top_by_pos"].get(POS_TE))
+    if not best:
+        return None
+    return ("Highest scoring TE", team, f"{best['name']} — {best['points']} pts")
 
-    def first_team_out_overall():
-        if not standings or len(standings) < 7:
-            return None
-        t = standings[6]
-        rec = f"{t['wins']}-{t['losses']}" + (f"-{t['ties']}" if t.get("ties") else "")
-        return ("First Team Out", t["name"], f"7th place • {rec}, PF {t['points_for']}")
-
-    mapping = {
-        1: highest_scoring_team,
-        2: team_with_highest_scoring_player_starters_incl_dst,
-        3: team_with_highest_scoring_bench_player,
-        4: smallest_margin_of_victory,
-        5: widest_margin_of_victory,
-        6: highest_scoring_starting_k,
-        7: highest_scoring_starting_qb,
-        8: most_points_scored_in_losing_effort,
-        9: first_place_after_week9,
-        10: team_with_dst_most_points,
-        11: highest_combined_starting_rb_points_incl_flex,
-        12: team_closest_to_projected_total,
-        13: most_points_against_cumulative,
-        14: lowest_scoring_team,
-        15: highest_scoring_flex,
-        16: highest_scoring_te,
-        17: first_team_out_overall,
-    }
+def _first_team_out_overall(week, matchups, standings, week_rows):
+    if not standings or len(standings) < 7:
+        return None
+    t = standings[6]
+    rec = f"{t['wins']}-{t['losses']}" + (f"-{t['ties']}" if t.get("ties") else "")
+    return ("First Team Out", t["name"], f"7th place • {rec}, PF {t['points_for']}")
+
+# (helper, title shown in the season table and "next week" teaser), indexed by week - 1.
+_WEEKLY_CHALLENGES = (
+    (_highest_scoring_team, "Highest scoring team"),  # week 1
+    (_team_with_highest_scoring_player_starters_incl_dst, "Highest scoring player (starter, D/ST incl.)"),  # week 2
+    (_team_with_highest_scoring_bench_player, "Highest scoring bench player"),  # week 3
+    (_smallest_margin_of_victory, "Smallest margin of victory"),  # week 4
+    (_widest_margin_of_victory, "Widest margin of victory"),  # week 5
+    (_highest_scoring_starting_k, "Highest scoring starting K"),  # week 6
+    (_highest_scoring_starting_qb, "Highest scoring starting QB"),  # week 7
+    (_most_points_scored_in_losing_effort, "Most points in a losing effort"),  # week 8
+    (_first_place_after_week9, "First place overall (after 9 weeks)"),  # week 9
+    (_team_with_dst_most_points, "D/ST with most points"),  # week 10
+    (_highest_combined_starting_rb_points_incl_flex, "Highest combined starting RB points"),  # week 11
+    (_team_closest_to_projected_total, "Closest to projected total"),  # week 12
+    (_most_points_against_cumulative, "Most points against (season)"),  # week 13
+    (_lowest_scoring_team, "Lowest weekly score"),  # week 14
+    (_highest_scoring_flex, "Highest scoring FLEX"),  # week 15
+    (_highest_scoring_te, "Highest scoring TE"),  # week 16
+    (_first_team_out_overall, "First Team Out"),  # week 17
+)
 
-    fn = mapping.get(int(week))
-    if not fn:
+def compute_week_challenge(week: int, matchups, standings, week_rows):
+    """
+    Returns dict {title:'Weekly Challenge Winner', winner:'Team ...', detail:'...'} or None.
+    Implements your updated rotation for Weeks 1–17.
+    """
+    if not 1 <= week <= len(_WEEKLY_CHALLENGES):
         return None
     try:
-        res = fn() if callable(fn) else None
+        helper, _ = _WEEKLY_CHALLENGES[week - 1]
+        res = helper(week, matchups, standings, week_rows)
         if not res:
             return None
         title, winner, detail = res
@@ -943,29 +1036,10 @@ def compute_week_challenge(week: int, matchups, standings, week_rows):
 # ============================
 
 def get_challenge_title_by_week(week: int) -> str | None:
-    titles = {
-        1: "Highest scoring team",
-        2: "Highest scoring player (starter, D/ST incl.)",
-        3: "Highest scoring bench player",
-        4: "Smallest margin of victory",
-        5: "Widest margin of victory",
-        6: "Highest scoring starting K",
-        7: "Highest scoring starting QB",
-        8: "Most points in a losing effort",
-        9: "First place overall (after 9 weeks)",
-        10: "D/ST with most points",
-        11: "Highest combined starting RB points",
-        12: "Closest to projected total",
-        13: "Most points against (season)",
-        14: "Lowest weekly score",
-        15: "Highest scoring FLEX",
-        16: "Highest scoring TE",
-        17: "First Team Out",
-    }
-    return titles.get(int(week))
+    return _WEEKLY_CHALLENGES[week - 1][1] if 1 <= week <= len(_WEEKLY_CHALLENGES) else None
 
 def describe_upcoming_challenge(current_week: int) -> dict | None:
-    next_week = int(current_week) + 1
+    next_week = current_week + 1
     title = get_challenge_title_by_week(next_week)
     if not title:
         return None
@@ -995,7 +1069,7 @@ def compute_power_rankings(standings: list[dict]) -> list[dict]:
             "pa": round(pa, 2),
             "score": round(score, 3),
         })
-    rows.sort(key=lambda x: (x["score"], x["pf"]), reverse=True)
+    rows.sort(key=itemgetter("score", "pf"), reverse=True)
     for i, r in enumerate(rows, start=1):
         r["rank"] = i
     return rows
@@ -1006,23 +1080,33 @@ def compute_power_rankings(standings: list[dict]) -> list[dict]:
 
 MAX_CHALLENGE_WEEK = 17
 
-def _fetch_week_bits(season: int, week: int):
-    payloads = espn_fetch_jsons(LEAGUE_ID, season, week)
-    scoreboard = payloads["scoreboard"]
-    teams = payloads["teams"]
-    boxscore = payloads["boxscore"]
-    matchups = summarize_matchups(scoreboard, teams, week)
-    week_rows = build_week_stats_from_boxscore(boxscore, teams, week)
-    standings = extract_standings(teams)
-    return matchups, standings, week_rows
+def _fetch_week_bits(season: int, week: int, by_week: dict, team_map: dict):
+    # Scores come from the season schedule index; only the per-period rosters need a request,
+    # and finished weeks are served from the on-disk cache when present.
+    if _week_is_final(by_week, week):
+        boxscore = espn_fetch_boxscore_cached(LEAGUE_ID, season, week)
+    else:
+        boxscore = espn_fetch_boxscore(LEAGUE_ID, season, week)
+    matchups = _summarize_week_schedule(by_week.get(week) or [], team_map)
+    week_rows = build_week_stats_from_boxscore(boxscore, None, week, team_map)
+    return matchups, week_rows
+
+def build_weekly_challenges(season: int, current_week: int, scoreboard: dict, standings: list[dict], team_map: dict) -> list[dict]:
+    # The season scoreboard already carries every week's schedule, so index it once
+    # and reuse the current standings/team names rather than re-deriving them per week.
+    by_week = _index_schedule_by_week(scoreboard.get("schedule"))
+
+    # Past weeks are independent network fetches; run them in parallel, compute in order.
+    played = range(1, min(current_week, MAX_CHALLENGE_WEEK) + 1)
+    with ThreadPoolExecutor(max_workers=WEEK_FETCH_WORKERS) as ex:
+        fetched = {wk: ex.submit(_fetch_week_bits, season, wk, by_week, team_map) for wk in played}
 
-def build_weekly_challenges(season: int, current_week: int) -> list[dict]:
     rows = []
     for wk in range(1, MAX_CHALLENGE_WEEK + 1):
         title = get_challenge_title_by_week(wk) or f"Challenge Week {wk}"
         if wk <= current_week:
             try:
-                matchups, standings, week_rows = _fetch_week_bits(season, wk)
+                matchups, week_rows = fetched[wk].result()
                 ch = compute_week_challenge(wk, matchups, standings, week_rows)
                 if ch:
                     rows.append({
@@ -1044,15 +1128,23 @@ def build_weekly_challenges(season: int, current_week: int) -> list[dict]:
 # Narrative blurb
 # ===============
 
-def build_narrative(matchups, week, week_rows=None):
+def build_narrative(matchups, week: int, week_rows=None):
     if not matchups:
         return f"No results yet for Week {week}."
 
-    closest = min(matchups, key=lambda m: m["abs_margin"])
-    blowout = max(matchups, key=lambda m: m["abs_margin"])
-    lowest_pair = min(matchups, key=lambda m: min(m["home_pts"], m["away_pts"]))
-    loser_team = lowest_pair["home"] if lowest_pair["home_pts"] < lowest_pair["away_pts"] else lowest_pair["away"]
+    # One pass for closest game, biggest blowout and lowest single score (first wins ties).
+    closest = blowout = lowest_pair = matchups[0]
     loser_score = min(lowest_pair["home_pts"], lowest_pair["away_pts"])
+    for m in matchups[1:]:
+        margin = m["abs_margin"]
+        if margin < closest["abs_margin"]:
+            closest = m
+        if margin > blowout["abs_margin"]:
+            blowout = m
+        low = min(m["home_pts"], m["away_pts"])
+        if low < loser_score:
+            lowest_pair, loser_score = m, low
+    loser_team = lowest_pair["home"] if lowest_pair["home_pts"] < lowest_pair["away_pts"] else lowest_pair["away"]
 
     lines = []
     lines.append(f"Week {week} is in the books!")
@@ -1065,34 +1157,34 @@ def build_narrative(matchups, week, week_rows=None):
         f"with a margin of {blowout['abs_margin']}."
     )
 
-    idx = (int(week) - 1) % 3
+    idx = (week - 1) % 3
     if isinstance(week_rows, list) and week_rows:
-        underperf = []
+        # Biggest miss vs projection (20+ points under); first team wins ties.
+        worst = None
         for r in week_rows:
             proj = r.get("proj")
             pts = r.get("pts", 0)
-            if isinstance(proj, (int, float)) and (proj - pts) >= 20:
-                underperf.append({
-                    "team": r["team"],
-                    "proj": float(proj),
-                    "pts": float(pts),
-                    "delta": round(float(proj - pts), 2),
-                })
-        if underperf:
-            worst = max(underperf, key=lambda x: x["delta"])
-            u_msgs = [
-                f"{worst['team']} missed the memo: projected {worst['proj']:.1f}, delivered {worst['pts']:.1f} (−{worst['delta']:.1f}).",
-                f"{worst['team']} got humbled—{worst['proj']:.1f} projected, only {worst['pts']:.1f}. That’s a {worst['delta']:.1f}-point faceplant.",
-                f"Vegas had {worst['team']} at {worst['proj']:.1f}; reality said {worst['pts']:.1f}. {worst['delta']:.1f} under. Yikes.",
-            ]
-            lines.append(" " + u_msgs[idx])
-
-    l_msgs = [
-        f"And bringing up the rear, {loser_team} with just {loser_score:.1f}. Someone check their Wi-Fi.",
-        f"Weekly floor goes to {loser_team}: {loser_score:.1f} points. Bench might sue for playing time.",
-        f"{loser_team} posted {loser_score:.1f}. The kicker’s carpool scored more.",
-    ]
-    lines.append(" " + l_msgs[idx])
+            if isinstance(proj, _NUMBER) and (proj - pts) >= 20:
+                delta = round(float(proj - pts), 2)
+                if worst is None or delta > worst["delta"]:
+                    worst = {"team": r["team"], "proj": float(proj), "pts": float(pts), "delta": delta}
+        # Only the variant for this week's rotation is formatted.
+        if worst:
+            if idx == 0:
+                u_msg = f"{worst['team']} missed the memo: projected {worst['proj']:.1f}, delivered {worst['pts']:.1f} (−{worst['delta']:.1f})."
+            elif idx == 1:
+                u_msg = f"{worst['team']} got humbled—{worst['proj']:.1f} projected, only {worst['pts']:.1f}. That’s a {worst['delta']:.1f}-point faceplant."
+            else:
+                u_msg = f"Vegas had {worst['team']} at {worst['proj']:.1f}; reality said {worst['pts']:.1f}. {worst['delta']:.1f} under. Yikes."
+            lines.append(" " + u_msg)
+
+    if idx == 0:
+        l_msg = f"And bringing up the rear, {loser_team} with just {loser_score:.1f}. Someone check their Wi-Fi."
+    elif idx == 1:
+        l_msg = f"Weekly floor goes to {loser_team}: {loser_score:.1f} points. Bench might sue for playing time."
+    else:
+        l_msg = f"{loser_team} posted {loser_score:.1f}. The kicker’s carpool scored more."
+    lines.append(" " + l_msg)
 
     return " ".join(lines)
 
@@ -1100,358 +1192,28 @@ def build_narrative(matchups, week, week_rows=None):
 # HTML template
 # =============
 
-HTML_TMPL = Template("""<!doctype html>
-<html>
-  <body style="margin:0; padding:0; background:#f5f7fb;">
-    <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background:#f5f7fb; padding:24px 0;">
-      <tr>
-        <td align="center">
-          <table role="presentation" width="640" cellspacing="0" cellpadding="0" border="0" style="width:640px; max-width:100%; background:#ffffff; border-radius:12px; overflow:hidden; box-shadow:0 2px 8px rgba(0,0,0,0.06);">
-
-<tr>
-  <td style="background:#0f172a; color:#ffffff; padding:18px 28px; font-family:Arial, Helvetica, sans-serif;">
-    <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0">
-      <tr>
-        <td align="left" valign="middle" style="padding-right:12px;">
-          <div style="font-size:22px; line-height:1.2; font-weight:700; letter-spacing:.3px;">Geno's Weekly</div>
-        </td>
-        <td align="right" valign="middle" width="120" style="width:120px;">
-          {% if logo_url %}
-          <img src="{{ logo_url }}"
-               alt="Geno's Weekly"
-               width="120"
-               style="display:block;width:120px;height:auto;border:0;outline:none;text-decoration:none;">
-          {% endif %}
-        </td>
-      </tr>
-    </table>
-  </td>
-</tr>
-
-            <tr>
-              <td style="padding:20px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin-bottom:10px;">Weekly Recap</div>
-                <div style="font-size:14px; color:#334155; line-height:1.5;">
-                  {{ narrative }}
-                </div>
-              </td>
-            </tr>
-
-            {% if challenge %}
-            <tr>
-              <td style="padding:0 24px 8px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background:#ecfdf5; border:1px solid #10b981; border-radius:10px;">
-                  <tr>
-                    <td style="padding:14px 16px;">
-                      <div style="font-size:15px; font-weight:700; color:#065f46; margin-bottom:4px;">
-                        🏅 Weekly Challenge Winner — {{ challenge.subtitle }}
-                      </div>
-                      <div style="font-size:14px; color:#065f46;">
-                        <strong>{{ challenge.winner }}</strong> <span style="opacity:.85;">({{ challenge.detail }})</span>
-                      </div>
-                    </td>
-                  </tr>
-                </table>
-              </td>
-            </tr>
-            {% endif %}
-
-            {% if next_challenge %}
-            <tr>
-              <td style="padding:0 24px 8px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background:#eff6ff; border:1px solid #3b82f6; border-radius:10px;">
-                  <tr>
-                    <td style="padding:14px 16px;">
-                      <div style="font-size:15px; font-weight:700; color:#1e40af; margin-bottom:4px;">
-                        🔮 {{ next_challenge.label }}
-                      </div>
-                      <div style="font-size:14px; color:#1e3a8a;">
-                        {{ next_challenge.subtitle }}
-                      </div>
-                    </td>
-                  </tr>
-                </table>
-              </td>
-            </tr>
-            {% endif %}
-
-            <tr>
-              <td style="padding:12px 24px 6px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin-bottom:10px;">Matchups & Results</div>
-                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="border-collapse:separate; border-spacing:0 10px;">
-                  {% for m in matchups %}
-                  <tr>
-                    <td style="background:#f8fafc; border:1px solid #e5e7eb; border-radius:10px; padding:12px;">
-                      <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0">
-                        <tr>
-                          <td style="width:40%; font-size:14px; color:#0f172a; {% if m.winner=='away' %}font-weight:700{% endif %}">{{ m.away }}</td>
-                          <td style="width:20%; text-align:center; font-size:14px; color:#334155;">
-                            <span style="display:inline-block; background:#eef2ff; color:#3730a3; border-radius:999px; padding:3px 10px; font-size:12px;">
-                              {{ m.away_pts }} — {{ m.home_pts }}
-                            </span>
-                          </td>
-                          <td style="width:40%; font-size:14px; color:#0f172a; text-align:right; {% if m.winner=='home' %}font-weight:700{% endif %}">{{ m.home }}</td>
-                        </tr>
-                        <tr>
-                          <td colspan="3" style="padding-top:6px; font-size:12px; color:#64748b; text-align:center;">
-                            {% if m.winner=='home' %}
-                              <strong style="color:#065f46;">Winner: {{ m.home }}</strong> (margin {{ m.abs_margin }})
-                            {% elif m.winner=='away' %}
-                              <strong style="color:#065f46;">Winner: {{ m.away }}</strong> (margin {{ m.abs_margin }})
-                            {% elif m.winner=='tie' %}
-                              <strong style="color:#7c3aed;">Result: Tie</strong>
-                            {% else %}
-                              <em>In progress</em>
-                            {% endif %}
-                          </td>
-                        </tr>
-                      </table>
-                    </td>
-                  </tr>
-                  {% endfor %}
-                </table>
-                {% if matchups|length == 0 %}
-                  <div style="font-size:13px; color:#64748b; padding:6px 0 12px;">No matchups found for this week yet.</div>
-                {% endif %}
-              </td>
-            </tr>
-
-            {% if playoff_bracket and playoff_bracket|length > 0 %}
-            <tr>
-              <td style="padding:16px 24px 8px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:14px; font-weight:700; color:#111827; text-transform:uppercase; letter-spacing:.1em; margin-bottom:2px;">
-                  Winner's Bracket
-                </div>
-                <div style="font-size:11px; color:#6b7280; text-transform:uppercase; letter-spacing:.12em; margin-bottom:10px;">
-                  {% if playoff_bracket[0].result_tag == 'PROJ' %}
-                    Projected | Round 1
-                  {% else %}
-                    Playoffs
-                  {% endif %}
-                </div>
-
-                <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0" style="border-collapse:separate; border-spacing:0 8px;">
-                  <tbody>
-                    {% for g in playoff_bracket %}
-                    <tr>
-                      <td>
-                        <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0"
-                               style="border-radius:10px; border:1px solid #e5e7eb; background:#ffffff;">
-                          <tr>
-                            <td style="padding:8px 10px; width:36px; vertical-align:top;">
-                              {% if g.team1_logo %}
-                              <img src="{{ g.team1_logo }}" alt="{{ g.team1 }}" width="28" height="28"
-                                   style="display:block; border-radius:999px; object-fit:cover;">
-                              {% else %}
-                              <div style="width:28px; height:28px; border-radius:999px; background:#e5e7eb;"></div>
-                              {% endif %}
-                            </td>
-                            <td style="padding:8px 10px 4px 0; vertical-align:top;">
-                              <div style="font-size:13px; color:#111827; font-weight:600;">
-                                {% if g.team1_seed %}#{{ g.team1_seed }} {% endif %}{{ g.team1 }}
-                              </div>
-                              {% if g.team1_record %}
-                              <div style="font-size:11px; color:#6b7280; margin-top:2px;">
-                                ({{ g.team1_record }})
-                              </div>
-                              {% endif %}
-                            </td>
-                            <td style="padding:8px 10px 4px 10px; text-align:right; vertical-align:top; white-space:nowrap;">
-                              {% if g.score and g.result_tag != 'PROJ' %}
-                                <div style="font-size:13px; font-weight:700; color:#111827;"></div>
-                              {% elif g.status == 'BYE' %}
-                                <div style="font-size:11px; color:#6b7280; font-weight:600;">BYE</div>
-                              {% endif %}
-                            </td>
-                          </tr>
-
-                          <tr>
-                            <td style="padding:0 10px 8px 10px; width:36px; vertical-align:top;">
-                              {% if g.team2 %}
-                                {% if g.team2_logo %}
-                                <img src="{{ g.team2_logo }}" alt="{{ g.team2 }}" width="28" height="28"
-                                     style="display:block; border-radius:999px; object-fit:cover;">
-                                {% else %}
-                                <div style="width:28px; height:28px; border-radius:999px; background:#e5e7eb;"></div>
-                                {% endif %}
-                              {% else %}
-                                <div style="width:28px; height:28px; border-radius:999px; background:#f3f4f6;"></div>
-                              {% endif %}
-                            </td>
-                            <td style="padding:0 10px 8px 0; vertical-align:middle;">
-                              {% if g.team2 %}
-                              <div style="font-size:13px; color:#111827; font-weight:600;">
-                                {% if g.team2_seed %}#{{ g.team2_seed }} {% endif %}{{ g.team2 }}
-                              </div>
-                              {% if g.team2_record %}
-                              <div style="font-size:11px; color:#6b7280; margin-top:2px;">
-                                ({{ g.team2_record }})
-                              </div>
-                              {% endif %}
-                              {% else %}
-                              <div style="font-size:13px; color:#9ca3af; font-style:italic;">
-                                BYE
-                              </div>
-                              {% endif %}
-                            </td>
-                            <td style="padding:0 10px 8px 10px; text-align:right; vertical-align:middle; white-space:nowrap;">
-                              {% if g.status and g.result_tag != 'PROJ' %}
-                                <div style="font-size:11px; color:#6b7280;">{{ g.status }}</div>
-                              {% endif %}
-                            </td>
-                          </tr>
-                        </table>
-                      </td>
-                    </tr>
-                    {% endfor %}
-                  </tbody>
-                </table>
-
-                <div style="font-size:11px; color:#94a3b8; margin-top:6px;">
-                  {% if playoff_bracket[0].result_tag == 'PROJ' %}
-                    Projected based on current standings (not an official ESPN bracket).
-                  {% else %}
-                    Pulled directly from ESPN’s live playoff schedule.
-                  {% endif %}
-                </div>
-              </td>
-            </tr>
-            {% endif %}
-
-            {% if standings and standings|length > 0 %}
-            <tr>
-              <td style="padding:4px 24px 12px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin:14px 0 8px;">Standings</div>
-                <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0" style="border-collapse:collapse; border:1px solid #e5e7eb;">
-                  <thead>
-                    <tr style="background:#f1f5f9;">
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Team</th>
-                      <th align="center" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">W-L-T</th>
-                    </tr>
-                  </thead>
-                  <tbody>
-                    {% for r in standings %}
-                    <tr>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ r.name }}</td>
-                      <td align="center" style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">
-                        {{ r.wins }}-{{ r.losses }}{% if r.ties %}-{{ r.ties }}{% endif %}
-                      </td>
-                    </tr>
-                    {% endfor %}
-                  </tbody>
-                </table>
-              </td>
-            </tr>
-            {% endif %}
-
-            {% if power and power|length > 0 %}
-            <tr>
-              <td style="padding:4px 24px 20px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin:14px 0 8px;">Power Rankings</div>
-                <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0" style="border-collapse:collapse; border:1px solid #e5e7eb;">
-                  <thead>
-                    <tr style="background:#f1f5f9;">
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">#</th>
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Team</th>
-                      <th align="center" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Record</th>
-                      <th align="right" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">PF</th>
-                      <th align="right" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">PA</th>
-                      <th align="right" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Score</th>
-                    </tr>
-                  </thead>
-                  <tbody>
-                    {% for r in power %}
-                    <tr>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ r.rank }}</td>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ r.name }}</td>
-                      <td align="center" style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">{{ r.record }}</td>
-                      <td align="right" style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">{{ r.pf }}</td>
-                      <td align="right" style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">{{ r.pa }}</td>
-                      <td align="right" style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">{{ r.score }}</td>
-                    </tr>
-                    {% endfor %}
-                  </tbody>
-                </table>
-                <div style="font-size:11px; color:#94a3b8; margin-top:6px;">Score = 2×Wins − Losses + (PF − PA)/100</div>
-              </td>
-            </tr>
-            {% endif %}
-
-            {% if weekly_challenges and weekly_challenges|length > 0 %}
-            <tr>
-              <td style="padding:12px 24px 6px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin-bottom:10px;">Weekly Challenges</div>
-                <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0" style="border-collapse:collapse; border:1px solid #e5e7eb;">
-                  <thead>
-                    <tr style="background:#f1f5f9;">
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Week</th>
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Challenge</th>
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Winner</th>
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Details</th>
-                    </tr>
-                  </thead>
-                  <tbody>
-                    {% for row in weekly_challenges %}
-                    <tr>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">W{{ row.week }}</td>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ row.title }}</td>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ row.winner }}</td>
-                      <td style="padding:8px 10px; font-size:13px; color:#334155; border-bottom:1px solid #e5e7eb;">{{ row.detail }}</td>
-                    </tr>
-                    {% endfor %}
-                  </tbody>
-                </table>
-              </td>
-            </tr>
-            {% endif %}
-
-            {% if waiver and waiver|length > 0 %}
-            <tr>
-              <td style="padding:12px 24px 6px 24px; font-family:Arial, Helvetica, sans-serif;">
-                <div style="font-size:16px; font-weight:700; color:#0f172a; margin-bottom:10px;">Waiver Wire Order (Next Week)</div>
-                <table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0" style="border-collapse:collapse; border:1px solid #e5e7eb;">
-                  <thead>
-                    <tr style="background:#f1f5f9;">
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">#</th>
-                      <th align="left" style="padding:8px 10px; font-size:12px; color:#334155; border-bottom:1px solid #e5e7eb;">Team</th>
-                    </tr>
-                  </thead>
-                  <tbody>
-                    {% for w in waiver %}
-                    <tr>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ w.rank }}</td>
-                      <td style="padding:8px 10px; font-size:13px; color:#0f172a; border-bottom:1px solid #e5e7eb;">{{ w.name }}</td>
-                    </tr>
-                    {% endfor %}
-                  </tbody>
-                </table>
-                <div style="font-size:11px; color:#94a3b8; margin-top:6px;">If your league uses rolling waivers or FAAB, this reflects the current priority. Otherwise it’s the inverse of standings.</div>
-              </td>
-            </tr>
-            {% endif %}
-
-            <tr>
-              <td style="padding:18px 24px 26px 24px; font-family:Arial, Helvetica, sans-serif; color:#94a3b8; font-size:12px; text-align:center;">
-                Sent from the Geno's league headquarters by Commissioner Lally's office • Week {{ week }}<br>
-                Generated {{ now }}
-              </td>
-            </tr>
-
-          </table>
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>
-""".strip())
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+JINJA_CACHE_DIR = os.environ.get("JINJA_CACHE", "/tmp/jinja_cache")
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
+# Compiled template bytecode is cached on disk, so repeat runs skip lex/parse/compile.
+ENV = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    bytecode_cache=FileSystemBytecodeCache(directory=JINJA_CACHE_DIR),
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+HTML_TMPL = ENV.get_template("body.html.j2")
 
 # =====
 # Main
 # =====
 
 def main():
-    today = datetime.date.today()
-    season = int(SEASON) if SEASON else today.year
+    now = datetime.datetime.now()
+    season = int(SEASON) if SEASON else now.year
     week = int(WEEK) if WEEK else 1
 
     payloads = espn_fetch_jsons(LEAGUE_ID, season, week)
@@ -1459,20 +1221,22 @@ def main():
     teams = payloads["teams"]
     boxscore = payloads["boxscore"]
 
-    matchups = summarize_matchups(scoreboard, teams, week)
+    team_map = build_team_name_map(teams)
+    print(f"[INFO] Built team name map for {len(team_map)} teams")
+    matchups = summarize_matchups(scoreboard, teams, week, team_map)
     standings = extract_standings(teams)
-    week_rows = build_week_stats_from_boxscore(boxscore, teams, week)
+    week_rows = build_week_stats_from_boxscore(boxscore, teams, week, team_map)
 
     challenge = compute_week_challenge(week, matchups, standings, week_rows)
     power = compute_power_rankings(standings)
     next_challenge = describe_upcoming_challenge(week)
-    weekly_challenges = build_weekly_challenges(season, week)
+    weekly_challenges = build_weekly_challenges(season, week, scoreboard, standings, team_map)
     waiver = compute_waiver_order(teams, standings)
 
     # Playoff bracket: real if available, else projected preview
     playoff_bracket: list[dict] = []
     try:
-        playoff_bracket = build_real_playoff_bracket(season, teams, current_week=week)
+        playoff_bracket = build_real_playoff_bracket(season, teams, current_week=week, team_map=team_map)
     except Exception as e:
         print(f"[WARN] Playoff bracket fetch failed: {e}", file=sys.stderr)
         playoff_bracket = []
@@ -1485,7 +1249,14 @@ def main():
     if not matchups:
         print("[WARN] No matchups found for that week/season.", file=sys.stderr)
 
-    html = HTML_TMPL.render(
+    subject = f"Fantasy Week {week} Results & Notes"
+
+    try:
+        os.mkdir("out")
+    except FileExistsError:
+        pass
+    # Stream the body to disk as it renders rather than materializing the full HTML string.
+    HTML_TMPL.stream(
         week=week,
         matchups=matchups,
         standings=standings,
@@ -1497,15 +1268,10 @@ def main():
         waiver=waiver,
         playoff_bracket=playoff_bracket,
         logo_url=LOGO_URL,
-        now=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-    )
-    subject = f"Fantasy Week {week} Results & Notes"
-
-    os.makedirs("out", exist_ok=True)
-    with open("out/body.html", "w", encoding="utf-8") as f:
-        f.write(html)
-    with open("out/subject.txt", "w", encoding="utf-8") as f:
-        f.write(subject)
+        now=now.isoformat(sep=" ", timespec="minutes"),
+    ).dump("out/body.html.tmp", encoding="utf-8")
+    os.replace("out/body.html.tmp", "out/body.html")
+    _write_atomic("out/subject.txt", subject.encode("utf-8"))
     print("[INFO] Wrote out/body.html and out/subject.txt")
 
 if __name__ == "__main__":
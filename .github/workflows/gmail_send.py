@@ -2,12 +2,12 @@ import base64
 import os
 import pathlib
 import sys
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from email import policy
+from email.message import EmailMessage
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def fail(msg: str, code: int = 1):
@@ -22,11 +22,13 @@ REQUIRED_VARS = [
     "GMAIL_CLIENT_SECRET",
     "GMAIL_REFRESH_TOKEN",
 ]
-for k in REQUIRED_VARS:
-    if not os.environ.get(k):
-        fail(f"Missing env var {k}. Check your GitHub Secrets.")
+_missing = [k for k in REQUIRED_VARS if not os.environ.get(k)]
+if _missing:
+    fail(f"Missing env vars: {', '.join(_missing)}. Check your GitHub Secrets.")
 
 SEND_MODE = os.getenv("SEND_MODE", "draft").strip().lower()  # 'draft' or 'send'
+if SEND_MODE not in ("draft", "send"):
+    fail(f"Unsupported SEND_MODE='{SEND_MODE}'. Use 'draft' or 'send'.")
 FROM_EMAIL = os.environ["FROM_EMAIL"].strip()
 CLIENT_ID = os.environ["GMAIL_CLIENT_ID"].strip()
 CLIENT_SECRET = os.environ["GMAIL_CLIENT_SECRET"].strip()
@@ -34,10 +36,38 @@ REFRESH_TOKEN = os.environ["GMAIL_REFRESH_TOKEN"].strip()
 
 # Optional recipients (comma-separated). If empty, the email goes to FROM_EMAIL only.
 RECIPIENTS_CSV = os.getenv("RECIPIENTS", "").strip()
+if RECIPIENTS_CSV:
+    RECIPIENTS = tuple(e.strip() for e in RECIPIENTS_CSV.split(",") if e.strip())
+else:
+    RECIPIENTS = (FROM_EMAIL,)
+if not RECIPIENTS:
+    fail("No recipients found. Set the RECIPIENTS secret or rely on FROM_EMAIL fallback.")
+
+# Gmail REST endpoints for the authorized user (drafts.create / messages.send).
+GMAIL_API = "https://gmail.googleapis.com/gmail/v1/users/me"
+
+# Only failures where Gmail cannot have acted on the POST are retried: connection errors
+# and 429/503 refusals (with exponential backoff, honoring Retry-After). Read timeouts and
+# other 5xx may follow a processed send, so they are never retried; after the last
+# attempt the response falls through to the error report.
+RETRY = Retry(
+    total=4,
+    read=0,
+    other=0,
+    backoff_factor=2,
+    status_forcelist=(429, 503),
+    allowed_methods=frozenset({"POST"}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
 
 
 def get_service():
-    """Builds an authenticated Gmail API client using a refresh token."""
+    """Builds an authorized HTTP session for the Gmail REST API using a refresh token."""
+    # Imported here so content/recipient checks fail fast without loading google-auth.
+    from google.auth.transport.requests import AuthorizedSession
+    from google.oauth2.credentials import Credentials
+
     creds = Credentials(
         None,
         refresh_token=REFRESH_TOKEN,
@@ -49,68 +79,57 @@ def get_service():
             "https://www.googleapis.com/auth/gmail.compose",
         ],
     )
-    try:
-        return build("gmail", "v1", credentials=creds)
-    except Exception as e:
-        fail(f"Could not build Gmail service client: {e}")
+    # The access token is fetched on the first request and refreshed automatically.
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(max_retries=RETRY))
+    return session
 
 
 def load_content():
     """Reads the subject/body produced by compose_email.py."""
-    subj_path = pathlib.Path("out/subject.txt")
-    body_path = pathlib.Path("out/body.html")
-    if not subj_path.exists() or not body_path.exists():
+    try:
+        subject = pathlib.Path("out/subject.txt").read_text(encoding="utf-8").strip()
+        html = pathlib.Path("out/body.html").read_text(encoding="utf-8")
+    except FileNotFoundError:
         fail(
             "Email content not found. Expected files 'out/subject.txt' and 'out/body.html'. "
             "Make sure the 'Compose email from ESPN' step ran successfully."
         )
-    subject = subj_path.read_text(encoding="utf-8").strip()
-    html = body_path.read_text(encoding="utf-8")
     return subject, html
 
 
-def determine_recipients():
-    """Builds the recipient list from RECIPIENTS or falls back to FROM_EMAIL."""
-    if RECIPIENTS_CSV:
-        recipients = [e.strip() for e in RECIPIENTS_CSV.split(",") if e.strip()]
-    else:
-        recipients = [FROM_EMAIL]
-
-    if not recipients:
-        fail("No recipients found. Set the RECIPIENTS secret or rely on FROM_EMAIL fallback.")
-    return recipients
-
-
-def build_message(subject: str, html: str, recipients: list[str]):
+def build_message(subject: str, html: str, recipients: tuple[str, ...]):
     """Creates a base64-encoded RFC 2822 email object for Gmail API."""
     # Add a [DRAFT] tag to the subject when drafting
     final_subject = f"[DRAFT] {subject}" if SEND_MODE == "draft" else subject
 
-    msg = MIMEMultipart("alternative")
+    msg = EmailMessage(policy=policy.SMTP)
     msg["From"] = FROM_EMAIL
     msg["To"] = ", ".join(recipients)
     msg["Subject"] = final_subject
-    msg.attach(MIMEText(html, "html"))
+    msg.set_content(html, subtype="html")
 
-    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
+    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode("ascii")
     return {"raw": raw}
 
 
 def send_or_draft(service, message):
     """Sends or creates a draft depending on SEND_MODE."""
+    if SEND_MODE == "draft":
+        url, body, label = f"{GMAIL_API}/drafts", {"message": message}, "Created Gmail draft id"
+    else:
+        url, body, label = f"{GMAIL_API}/messages/send", message, "Sent message id"
+
     try:
-        if SEND_MODE == "draft":
-            draft = service.users().drafts().create(userId="me", body={"message": message}).execute()
-            print(f"[INFO] Created Gmail draft id: {draft.get('id')}")
-        elif SEND_MODE == "send":
-            sent = service.users().messages().send(userId="me", body=message).execute()
-            print(f"[INFO] Sent message id: {sent.get('id')}")
-        else:
-            fail(f"Unsupported SEND_MODE='{SEND_MODE}'. Use 'draft' or 'send'.")
-    except HttpError as he:
+        # orjson emits bytes directly for the large base64 "raw" string.
+        resp = service.post(url, data=orjson.dumps(body), headers={"Content-Type": "application/json"}, timeout=60)
+    except Exception as e:
+        fail(f"Gmail API call failed: {e}")
+
+    if resp.status_code >= 400:
         # Common causes: invalid_grant (refresh token revoked), insufficient permissions (wrong scopes)
-        print("[ERROR] Gmail API HttpError:", file=sys.stderr)
-        print(str(he), file=sys.stderr)
+        print(f"[ERROR] Gmail API HTTP {resp.status_code}:", file=sys.stderr)
+        print(resp.text, file=sys.stderr)
         print(
             "[HINT] If you see 'invalid_grant' or 'insufficient permissions':\n"
             " - Recreate the refresh token in OAuth Playground with these scopes (one per line):\n"
@@ -119,24 +138,21 @@ def send_or_draft(service, message):
             " - Ensure FROM_EMAIL matches the account you authorized.\n",
             file=sys.stderr,
         )
-        raise
-    except Exception as e:
-        fail(f"Gmail API call failed: {e}")
+        resp.raise_for_status()
+
+    print(f"[INFO] {label}: {resp.json().get('id')}")
 
 
 def main():
     print(f"[INFO] SEND_MODE={SEND_MODE}")
-    if SEND_MODE not in ("draft", "send"):
-        fail("SEND_MODE must be 'draft' or 'send'.")
 
     subject, html = load_content()
-    recipients = determine_recipients()
 
     # Basic visibility in logs (don’t print full addresses)
     print(f"[INFO] Subject: {subject}")
-    print(f"[INFO] Recipients: {len(recipients)} (first: {recipients[0]})")
+    print(f"[INFO] Recipients: {len(RECIPIENTS)} (first: {RECIPIENTS[0]})")
 
-    message = build_message(subject, html, recipients)
+    message = build_message(subject, html, RECIPIENTS)
     service = get_service()
     send_or_draft(service, message)
     print("[INFO] Gmail step completed.")